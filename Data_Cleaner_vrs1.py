@@ -4,20 +4,203 @@ import numpy as np
 import io
 import seaborn as sns
 import matplotlib.pyplot as plt
+import os
+import csv
+import time
+import codecs
+import gzip
+import bz2
+import lzma
+import zipfile
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.feather as feather
+from dedupe import find_near_duplicates
 
 # ========== Page Config ==========
 st.set_page_config(page_title="Cleaner", layout="wide")
 st.title("Cleaner - Your data cleaning assistant")
 
-# ========== Load Uploaded CSV ==========
-def load_data(file):
-    if "file_name" not in st.session_state or st.session_state.file_name != file.name:
-        df = pd.read_csv(file)
-        st.session_state.df = df
-        st.session_state.raw_data = df.copy()
-        st.session_state.file_name = file.name
+# ========== Load Uploaded Data ==========
+UPLOAD_TYPES = ['csv', 'tsv', 'txt', 'gz', 'bz2', 'xz', 'zst', 'zip', 'parquet', 'feather', 'arrow', 'ipc']
+CSV_COMPRESSION = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz', '.zst': 'zstd', '.zip': 'zip'}
+SAMPLE_BYTES = 64 * 1024
+
+def file_format(name):
+    ext = os.path.splitext(name.lower())[1]
+    if ext == '.parquet':
+        return 'parquet', None
+    if ext in ('.feather', '.arrow', '.ipc'):
+        return 'arrow', None
+    return 'csv', CSV_COMPRESSION.get(ext)
+
+def open_decompressed(file, compression):
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=file)
+    if compression == 'bz2':
+        return bz2.BZ2File(file)
+    if compression == 'xz':
+        return lzma.LZMAFile(file)
+    if compression == 'zstd':
+        import zstandard
+        return zstandard.ZstdDecompressor().stream_reader(file, closefd=False)
+    if compression == 'zip':
+        archive = zipfile.ZipFile(file)
+        members = [m for m in archive.namelist() if not m.endswith('/') and not m.startswith('__MACOSX/')]
+        if not members:
+            raise ValueError("ZIP archive contains no files")
+        # always the same member, so the one sniffed is the one read
+        return archive.open(members[0])
+    return file
+
+def detect_encoding(sample):
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    for encoding in ['utf-8', 'cp1252']:
+        try:
+            # incremental decoder tolerates a character cut off at the sample end
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            pass
+    return 'latin-1'
+
+def sniff_csv(file, compression):
+    file.seek(0)
+    # only the first block is decompressed, the full read streams later
+    sample = open_decompressed(file, compression).read(SAMPLE_BYTES)
+    file.seek(0)
+    encoding = detect_encoding(sample)
+    text = codecs.getincrementaldecoder(encoding)(errors='replace').decode(sample, final=False)
+    if len(sample) == SAMPLE_BYTES:
+        text = text[:text.rfind('\n') + 1]
+    try:
+        sep = csv.Sniffer().sniff(text, delimiters=',;\t|').delimiter
+    except csv.Error:
+        # ragged rows make the sniffer give up, so count delimiters in the header instead
+        header = text.splitlines()[0] if text else ''
+        sep = max(',;\t|', key=header.count)
+    # header names as pandas will load them ('Unnamed: 0', 'a.1', ...), so usecols matches
+    columns = pd.read_csv(io.StringIO(text), sep=sep, nrows=0).columns.tolist()
+    return {'encoding': encoding, 'sep': sep, 'columns': columns}
+
+def upload_buffer(file):
+    # getbuffer is a view of the upload, so Arrow reads it without copying
+    return pa.py_buffer(file.getbuffer())
+
+def read_arrow(buf, columns=None):
+    try:
+        # handles Feather V1 and V2 (the Arrow IPC file format)
+        return feather.read_table(pa.BufferReader(buf), columns=columns, memory_map=False)
+    except pa.ArrowInvalid:
+        table = pa.ipc.open_stream(buf).read_all()
+        return table if columns is None else table.select(columns)
+
+def arrow_schema(buf):
+    for open_reader in [pa.ipc.open_file, pa.ipc.open_stream]:
+        try:
+            return open_reader(buf).schema
+        except pa.ArrowInvalid:
+            pass
+    # Feather V1 has no separate schema reader
+    return read_arrow(buf).schema
+
+def data_columns(schema):
+    # unnamed pandas indexes are stored as __index_level_N__; named ones are real data
+    return [name for name in schema.names if not name.startswith('__index_level_')]
+
+def inspect_file(file):
+    fmt, compression = file_format(file.name)
+    if fmt == 'csv':
+        meta = sniff_csv(file, compression)
+    elif fmt == 'parquet':
+        meta = {'columns': data_columns(pq.read_schema(pa.BufferReader(upload_buffer(file))))}
+    else:
+        meta = {'columns': data_columns(arrow_schema(upload_buffer(file)))}
+    meta.update(format=fmt, compression=compression)
+    return meta
+
+def read_file(file, meta, columns):
+    file.seek(0)
+    if meta['format'] == 'csv':
+        usecols = None if columns == meta['columns'] else columns
+        # the encoding is sniffed from the first block only, so fall back if later bytes disagree
+        for encoding in dict.fromkeys([meta['encoding'], 'cp1252', 'latin-1']):
+            file.seek(0)
+            try:
+                # C engine with numpy dtypes, which tolerates short rows in messy exports
+                df = pd.read_csv(open_decompressed(file, meta['compression']), sep=meta['sep'],
+                                 encoding=encoding, usecols=usecols)
+                return df, {'encoding': encoding}
+            except UnicodeDecodeError:
+                if encoding == 'latin-1':
+                    raise
+    buf = upload_buffer(file)
+    if meta['format'] == 'parquet':
+        table = pq.read_table(pa.BufferReader(buf), columns=columns)
+    else:
+        table = read_arrow(buf, columns)
+    # ArrowDtype columns keep pointing at the Arrow buffers instead of copying to numpy.
+    # Ignoring pandas metadata keeps a stored named index as an ordinary column, so the
+    # frame holds exactly the selected columns and the export does not drop it.
+    return table.to_pandas(types_mapper=pd.ArrowDtype, ignore_metadata=True), {}
+
+def ingest_summary(report):
+    parts = [f"Format: {report['format']}"]
+    if report['compression']:
+        parts[0] += f" ({report['compression']})"
+    if report['format'] == 'csv':
+        parts.append(f"Delimiter: {report['sep']!r}")
+        encoding = f"Encoding: {report['encoding']}"
+        if report['encoding'] != report['sniffed_encoding']:
+            encoding += f" (sniffed {report['sniffed_encoding']} from the first {SAMPLE_BYTES // 1024} KB)"
+        parts.append(encoding)
+    parts.append(f"{report['rows']} rows x {report['cols']} columns in {report['seconds']:.2f}s "
+                 f"({report['mb_per_s']:.1f} MB/s, {report['rows_per_s']:,.0f} rows/s)")
+    return " | ".join(parts)
+
+def load_data(file, meta, columns):
+    start = time.perf_counter()
+    df, used = read_file(file, meta, columns)
+    seconds = max(time.perf_counter() - start, 1e-9)
+    st.session_state.df = df
+    st.session_state.raw_data = df.copy()
+    st.session_state.file_name = file.name
+    st.session_state.load_key = (file.name, file.size)
+    st.session_state.ingest_report = dict(meta, sniffed_encoding=meta.get('encoding'), **used,
+                                          rows=df.shape[0], cols=df.shape[1], seconds=seconds,
+                                          mb_per_s=file.size / 1e6 / seconds,
+                                          rows_per_s=df.shape[0] / seconds)
     return st.session_state.df, st.session_state.raw_data
 
+def upload_file(file):
+    """Pick columns once per uploaded file and load it; True once the file is loaded"""
+    file_key = (file.name, file.size)
+    if st.session_state.get("load_key") == file_key:
+        return True
+    try:
+        if st.session_state.get("file_meta_key") != file_key:
+            st.session_state.file_meta = inspect_file(file)
+            st.session_state.file_meta_key = file_key
+        meta = st.session_state.file_meta
+
+        st.subheader("Columns to Load")
+        columns = st.multiselect("Only selected columns are read from the file",
+                                 meta['columns'], default=meta['columns'])
+        if "df" in st.session_state:
+            st.warning("Loading this file replaces the current dataset and all cleaning done on it.")
+        if st.button("Load Data"):
+            if not columns:
+                st.warning("Please select at least one column to load.")
+                return False
+            load_data(file, meta, columns)
+            return True
+    except Exception as e:
+        st.error(f"Could not read {file.name}: {e}")
+    return False
+
 # ========== Preview Section ==========
 def preview_data(df):
     st.subheader("Dataset Preview")
@@ -80,6 +263,54 @@ def remove_duplicates(df):
     else:
         st.info("No duplicates detected.")
 
+def near_duplicates(df):
+    st.subheader("Near Duplicates")
+    st.caption("Rows are matched on normalized key columns (case, spacing and punctuation ignored) "
+               "and small typos are caught with MinHash similarity.")
+    key_cols = st.multiselect("Select key columns", df.columns.tolist())
+    if not key_cols:
+        st.info("Please select at least one key column.")
+        return
+
+    block = st.selectbox("Block on column (only rows with the same first letters are compared)",
+                         ["None"] + key_cols)
+    block_chars = st.slider("Block prefix length", 1, 5, 1, disabled=block == "None")
+    threshold = st.slider("Similarity threshold", 0.5, 1.0, 0.8, 0.05)
+    workers = st.number_input("Worker processes", 1, os.cpu_count() or 1, os.cpu_count() or 1)
+
+    # fingerprint the key columns so clusters found before any edit or new upload are never reused
+    fingerprint = int(pd.util.hash_pandas_object(df[key_cols]).sum())
+    params = (tuple(key_cols), block, block_chars, threshold, df.shape, fingerprint)
+    if st.button("Find Near Duplicates"):
+        with st.spinner("Computing signatures..."):
+            st.session_state.near_dups = find_near_duplicates(
+                df, key_cols, block_col=None if block == "None" else block,
+                block_chars=block_chars, threshold=threshold, workers=int(workers))
+        st.session_state.near_dup_params = params
+
+    if st.session_state.get("near_dup_params") != params:
+        return
+    clusters = st.session_state.near_dups
+    if clusters.empty:
+        st.info("No near duplicates detected.")
+        return
+
+    extra = len(clusters) - clusters['cluster'].nunique()
+    st.warning(f"{clusters['cluster'].nunique()} clusters found covering {len(clusters)} rows "
+               f"({extra} rows beyond the first of each cluster).")
+    if st.checkbox("Show clusters"):
+        st.dataframe(df.loc[clusters.index].assign(cluster=clusters['cluster']).sort_values('cluster'))
+
+    action = st.radio("Action", ['Keep first row of each cluster', 'Drop all clustered rows'])
+    if action == 'Keep first row of each cluster':
+        to_drop = clusters.index[clusters['cluster'].duplicated()]
+    else:
+        to_drop = clusters.index
+    if st.button("Apply Near Duplicate Removal"):
+        st.session_state.df = df.drop(index=to_drop).reset_index(drop=True)
+        del st.session_state.near_dup_params
+        st.success(f"Removed {len(to_drop)} near duplicate rows.")
+
 def drop_columns(df):
     st.subheader("Drop Columns")
     cols = st.multiselect("Select columns to drop", df.columns.tolist())
@@ -175,7 +406,7 @@ def null_handling(df):
                 st.session_state.df = df
 
     elif sub == 'Fill Categorical Nulls':
-        cat_cols = df.select_dtypes(include=['object']).columns.tolist()
+        cat_cols = df.select_dtypes(include=['object', 'string']).columns.tolist()
         cat_nulls = null_per[null_per['Columns'].isin(cat_cols)].set_index('Columns')['null %'].to_dict()
         if not cat_nulls:
             st.info("No categorical nulls found.")
@@ -334,8 +565,10 @@ def outlier_detection(df):
                 lower = Q1 - 1.5 * IQR
                 upper = Q3 + 1.5 * IQR
                 
-                temp[col] = np.where(temp[col] < lower, lower, temp[col])
-                temp[col] = np.where(temp[col] > upper, upper, temp[col])
+                if pd.api.types.is_integer_dtype(temp[col]):
+                    # IQR bounds are fractional; cap every integer backend to the same float values
+                    temp[col] = temp[col].astype(float)
+                temp[col] = temp[col].clip(lower, upper)
                 
             if st.checkbox("Show capped rows"):
                 changed_rows = df[cols] != temp[cols]
@@ -360,10 +593,12 @@ def download_data(df):
     st.download_button("Download Cleaned CSV", df.to_csv(index=False), file_name="cleaned_data.csv")
 
 # ========== Main App ==========
-file = st.file_uploader("Upload your CSV file", type=['csv'])
+file = st.file_uploader("Upload your data file (CSV, compressed CSV, Parquet, Feather or Arrow IPC)",
+                        type=UPLOAD_TYPES)
 
-if file:
-    df, original = load_data(file)
+if file and upload_file(file):
+    df, original = st.session_state.df, st.session_state.raw_data
+    st.caption(ingest_summary(st.session_state.ingest_report))
 
     tab = st.sidebar.radio("What do you want to do?", 
                            ["Preview", "EDA", "Duplicate Handling", "Null Handling", "Outlier Detection", "Type Convertor", "Reset Data"])
@@ -373,9 +608,11 @@ if file:
     elif tab == "EDA":
         eda(df)
     elif tab == "Duplicate Handling":
-        action = st.sidebar.radio("Pick Task", ["Remove Duplicates", "Drop Columns"])
+        action = st.sidebar.radio("Pick Task", ["Remove Duplicates", "Near Duplicates", "Drop Columns"])
         if action == "Remove Duplicates":
             remove_duplicates(df)
+        elif action == "Near Duplicates":
+            near_duplicates(df)
         else:
             drop_columns(df)
     elif tab == "Null Handling":
@@ -0,0 +1,97 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dedupe
+
+
+def shingles(text, k=3):
+    data = text.encode("utf-8").ljust(k, b"\0")
+    return {data[i:i + k] for i in range(len(data) - k + 1)}
+
+
+def jaccard(x, y):
+    a, b = shingles(x), shingles(y)
+    return len(a & b) / len(a | b)
+
+
+def test_ragged_arange():
+    out = dedupe._ragged_arange(np.array([5, 0, 10]), np.array([2, 3, 1]))
+    assert out.tolist() == [5, 6, 0, 1, 2, 10]
+    assert dedupe._ragged_arange(np.array([], dtype=int), np.array([], dtype=int)).tolist() == []
+
+
+def test_shingle_codes_match_python():
+    strings = ["ab", "abcd", "", "x" * 50, "é ü"]
+    codes, offsets, counts = dedupe.shingle_codes(strings, 3)
+    for i, text in enumerate(strings):
+        got = codes[offsets[i]:offsets[i] + counts[i]]
+        expected = [int.from_bytes(s, "big") for s in shingles(text)]
+        assert sorted(set(got.tolist())) == sorted(expected)
+
+
+@pytest.mark.parametrize("threshold", [0.3, 0.5, 0.8])
+def test_verify_pairs_is_exact_jaccard(threshold):
+    rng = np.random.default_rng(0)
+    keys = ["".join(rng.choice(list("abcde "), rng.integers(1, 12))) for _ in range(60)]
+    pairs = np.array(list(itertools.combinations(range(len(keys)), 2)))
+    sig = dedupe.minhash_signatures(keys)
+
+    # slack=1 disables the MinHash prefilter so every pair gets the exact check
+    kept = dedupe.verify_pairs(keys, sig, pairs, threshold, 3, slack=1.0, chunk=100)
+    expected = [(u, v) for u, v in pairs if jaccard(keys[u], keys[v]) >= threshold]
+    assert sorted(map(tuple, kept.tolist())) == expected
+
+
+def test_connected_components_follows_chains():
+    labels = dedupe.connected_components(6, np.array([[4, 5], [0, 1], [1, 3]]))
+    assert labels.tolist() == [0, 0, 2, 0, 4, 4]
+
+
+def test_candidate_pairs_small_and_large_buckets():
+    sig = np.array([[1, 1]] * 4 + [[2, 2]] * 6 + [[3, 3]], dtype=np.uint32)
+    pairs = dedupe.candidate_pairs(sig, np.zeros(len(sig), dtype=int), bands=1, max_bucket=4)
+    pairs = set(map(tuple, pairs.tolist()))
+    # the small bucket is fully paired
+    assert set(itertools.combinations(range(4), 2)) <= pairs
+    # the large bucket only gets neighbours and the head, all inside the bucket
+    assert all(4 <= u < v < 10 for u, v in pairs - set(itertools.combinations(range(4), 2)))
+    assert len(pairs) == 6 + 5 + 4
+
+
+def test_case_whitespace_and_typo_variants_cluster():
+    df = pd.DataFrame({
+        "name": ["John Smith", "john  smith ", "Jonh Smith", "Maria Garcia", "MARIA GARCIA!", "Wei Chen"],
+        "email": ["john@x.com", "JOHN@X.COM", "john@x.com", "maria@y.com", "maria@y.com", "wei@z.com"],
+    })
+    found = dedupe.find_near_duplicates(df, ["name", "email"], threshold=0.6)
+    groups = found.groupby("cluster").apply(lambda g: sorted(g.index), include_groups=False)
+    assert sorted(groups.tolist()) == [[0, 1, 2], [3, 4]]
+    assert (found.loc[[0, 1, 2], "cluster_size"] == 3).all()
+
+
+def test_empty_and_missing_keys_never_match():
+    df = pd.DataFrame({"name": [None, None, "", "", "  ", "!!", np.nan]})
+    assert dedupe.find_near_duplicates(df, ["name"]).empty
+
+
+def test_single_row_and_empty_frame():
+    assert dedupe.find_near_duplicates(pd.DataFrame({"name": ["John"]}), ["name"]).empty
+    found = dedupe.find_near_duplicates(pd.DataFrame({"name": pd.Series([], dtype=object)}), ["name"])
+    assert found.empty
+    assert list(found.columns) == ["cluster", "cluster_size"]
+
+
+def test_blocking_keeps_prefixes_apart():
+    df = pd.DataFrame({"name": ["john smith", "xohn smith"]})
+    assert len(dedupe.find_near_duplicates(df, ["name"], threshold=0.7)) == 2
+    assert dedupe.find_near_duplicates(df, ["name"], block_col="name", threshold=0.7).empty
+
+
+def test_process_pool_matches_serial():
+    keys = [f"customer {i % 50} example" for i in range(200)]
+    serial = dedupe.minhash_signatures(keys, batch_size=50)
+    pooled = dedupe.minhash_signatures(keys, batch_size=50, workers=2)
+    assert np.array_equal(serial, pooled)